@@ -1,7 +1,7 @@
 use warp::Filter;
 use std::sync::Arc;
 use tokio::sync::RwLock;
-use log::{info, debug, error};
+use log::{info, error};
 
 mod server;
 mod packet;
@@ -9,6 +9,8 @@ mod query;
 mod update;
 
 const DNS_RECORDS_FILE: &str = "dns_records.txt";
+// A batch is applied under a single write lock, so keep its request body bounded
+const MAX_BATCH_BODY_BYTES: u64 = 256 * 1024;
 
 #[tokio::main]
 async fn main() {
@@ -23,20 +25,33 @@ async fn main() {
 
     let records_filter = warp::any().map(move || Arc::clone(&records_for_filter));
     
-    let update_route = warp::path("update")
+    let update_route = warp::path!("update")
         .and(warp::post())
         .and(warp::body::json())
         .and(records_filter.clone())
         .map(|new_record: update::DnsRecord, records: Arc<RwLock<update::DnsRecords>>| {
             tokio::spawn(async move {
-                update::update_record(records, new_record).await;
+                update::update_record(records, new_record, DNS_RECORDS_FILE).await;
+            });
+            warp::reply::reply()
+        });
+
+    // Batch variant of /update: applies all records under one lock and saves the file once
+    let batch_route = warp::path!("update" / "batch")
+        .and(warp::post())
+        .and(warp::body::content_length_limit(MAX_BATCH_BODY_BYTES))
+        .and(warp::body::json())
+        .and(records_filter.clone())
+        .map(|new_records: Vec<update::DnsRecord>, records: Arc<RwLock<update::DnsRecords>>| {
+            tokio::spawn(async move {
+                update::update_records(records, new_records, DNS_RECORDS_FILE).await;
             });
             warp::reply::reply()
         });
 
     // Use a tokio task to run the API server
     let api_server = async {
-        warp::serve(update_route).run(api_addr.parse::<std::net::SocketAddr>().unwrap()).await;
+        warp::serve(update_route.or(batch_route)).run(api_addr.parse::<std::net::SocketAddr>().unwrap()).await;
     };
 
     // Log that the API server has successfully started
@@ -195,6 +195,15 @@ fn read_name(packet: &[u8], mut offset: usize) -> Result<(String, usize), Box<dy
     Ok((name, offset))
 }
 
+/// The OPT pseudo-record (EDNS0) appended to every response. It never changes, so it is kept pre-encoded.
+const OPT_RECORD: [u8; 11] = [
+    0,          // Name (root)
+    0, 41,      // Type (OPT)
+    0x10, 0x00, // UDP payload size (4096)
+    0, 0, 0, 0, // Extended RCODE and flags
+    0, 0,       // RDLENGTH
+];
+
 /// Builds a DNS response packet based on the given query and IP address.
 ///
 /// # Parameters
@@ -202,33 +211,38 @@ fn read_name(packet: &[u8], mut offset: usize) -> Result<(String, usize), Box<dy
 /// - `ip`: An `Ipv4Addr` representing the IP address to include in the DNS response.
 /// - `response_code`: An `u8` representing the DNS response code.
 /// - `ttl`: A `u32` representing the TTL (Time To Live) of the DNS record.
-/// - `record_type`: A `String` representing the DNS record type.
-/// - `class`: A `String` representing the DNS record class.
 ///
 /// # Returns
 /// - `Vec<u8>`: A vector of bytes representing the DNS response packet.
-pub fn build_response(query: DnsQuery, ip: Ipv4Addr, response_code: u8, ttl: u32, record_type: String, class: String) -> Vec<u8> {
-    let mut response = Vec::new();
+pub fn build_response(query: DnsQuery, ip: Ipv4Addr, response_code: u8, ttl: u32) -> Vec<u8> {
+    // Sized for a classic 512-byte DNS message so the response is built without reallocating
+    let mut response = Vec::with_capacity(512);
 
     // Header
     response.extend(&query.id.to_be_bytes());
-    response.extend(&(query.flags | 0x8000).to_be_bytes()); // Set response flag
-    response.extend(&1u16.to_be_bytes()); // QDCOUNT
-    response.extend(&1u16.to_be_bytes()); // ANCOUNT
+    let flags = (query.flags | 0x8000) & !0x000F | (response_code as u16 & 0x000F); // Set response flag and RCODE
+    response.extend(&flags.to_be_bytes());
+    let qd_count = query.questions.len() as u16; // Every question is echoed back below
+    response.extend(&qd_count.to_be_bytes()); // QDCOUNT
+    let an_count = if response_code == 0 { qd_count } else { 0 }; // One answer per question on success
+    response.extend(&an_count.to_be_bytes()); // ANCOUNT
     response.extend(&0u16.to_be_bytes()); // NSCOUNT
     response.extend(&1u16.to_be_bytes()); // ARCOUNT
 
     // Question
+    let mut name_offsets = Vec::with_capacity(query.questions.len());
     for question in query.questions.iter() {
-        response.extend(encode_name(&question.name));
+        name_offsets.push(response.len()); // Where this question's name starts, for the answer pointers below
+        encode_name(&mut response, &question.name);
         response.extend(&question.qtype.to_be_bytes());
         response.extend(&question.qclass.to_be_bytes());
     }
 
     // Answer
     if response_code == 0 {
-        for question in query.questions.iter() {
-            response.extend(encode_name(&question.name));
+        // Point each answer's name back at its question (RFC 1035 section 4.1.4) instead of encoding the labels again
+        for name_offset in name_offsets {
+            response.extend(&(0xC000 | name_offset as u16).to_be_bytes()); // NAME (compression pointer)
             response.extend(&1u16.to_be_bytes()); // TYPE A
             response.extend(&1u16.to_be_bytes()); // CLASS IN
             response.extend(&ttl.to_be_bytes()); // TTL
@@ -238,27 +252,55 @@ pub fn build_response(query: DnsQuery, ip: Ipv4Addr, response_code: u8, ttl: u32
     }
 
     // Add OPT record to the response
-    response.extend(&[0u8][..]); // Name (root)
-    response.extend(&41u16.to_be_bytes()); // Type (OPT)
-    response.extend(&4096u16.to_be_bytes()); // UDP payload size
-    response.extend(&0u32.to_be_bytes()); // Extended RCODE and flags
-    response.extend(&0u16.to_be_bytes()); // RDLENGTH
+    response.extend_from_slice(&OPT_RECORD);
 
     response
 }
-/// Encodes a domain name into the DNS wire format.
+/// Encodes a domain name into the DNS wire format, appending it to the given buffer.
 ///
 /// # Parameters
+/// - `buf`: The buffer to append the encoded name to, typically the response being built.
 /// - `name`: A string slice representing the domain name to encode.
-///
-/// # Returns
-/// - `Vec<u8>`: A vector of bytes representing the encoded domain name.
-fn encode_name(name: &str) -> Vec<u8> {
-    let mut encoded = Vec::new();
+fn encode_name(buf: &mut Vec<u8>, name: &str) {
     for label in name.split('.') {
-        encoded.push(label.len() as u8);
-        encoded.extend(label.as_bytes());
+        buf.push(label.len() as u8);
+        buf.extend_from_slice(label.as_bytes());
+    }
+    buf.push(0);
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// A standard query for `www.example.com`, type A, class IN, with the RD bit set.
+    const QUERY: [u8; 33] = [
+        0x12, 0x34, 0x01, 0x00, 0, 1, 0, 0, 0, 0, 0, 0,
+        3, b'w', b'w', b'w', 7, b'e', b'x', b'a', b'm', b'p', b'l', b'e', 3, b'c', b'o', b'm', 0,
+        0, 1, 0, 1,
+    ];
+
+    #[test]
+    fn answered_query_header_and_pointer() {
+        let query = parse(&QUERY).unwrap();
+        let response = build_response(query, Ipv4Addr::new(93, 184, 216, 34), 0, 300);
+
+        assert_eq!(&response[..4], &[0x12, 0x34, 0x81, 0x00]); // ID, QR + RD, RCODE 0
+        assert_eq!(&response[4..8], &[0, 1, 0, 1]); // QDCOUNT 1, ANCOUNT 1
+        // The answer follows the echoed question and points back at its name at offset 12
+        assert_eq!(&response[QUERY.len()..QUERY.len() + 2], &[0xC0, 0x0C]);
+        assert_eq!(&response[QUERY.len() + 12..QUERY.len() + 16], &[93, 184, 216, 34]);
+    }
+
+    #[test]
+    fn nxdomain_sets_rcode_and_has_no_answer() {
+        let query = parse(&QUERY).unwrap();
+        let response = build_response(query, Ipv4Addr::UNSPECIFIED, 3, 60);
+
+        assert_eq!(response[3] & 0x0F, 3); // RCODE NXDOMAIN
+        assert_eq!(&response[4..8], &[0, 1, 0, 0]); // QDCOUNT 1, ANCOUNT 0
+        // Only the question and the OPT record follow the header
+        assert_eq!(response.len(), QUERY.len() + OPT_RECORD.len());
+        assert_eq!(&response[QUERY.len()..], &OPT_RECORD);
     }
-    encoded.push(0);
-    encoded
 }
@@ -21,24 +21,21 @@ pub async fn handle_query(query: DnsQuery, records: Arc<RwLock<HashMap<String, c
     let mut ip: Option<Ipv4Addr> = None;
     let mut response_code = 0;
     let mut ttl = 60;
-    let mut record_type = "A".to_string();
-    let mut class = "IN".to_string();
 
     if let Some(record) = records.get(&query.questions[0].name) {
         debug!("Found record for {}: {:?}", query.questions[0].name, record);
         ip = record.ip;
         ttl = record.ttl;
-        record_type = record.record_type.clone();
-        class = record.class.clone();
     } else {
         info!("No record found for {}", query.questions[0].name);
         response_code = 3; // NXDOMAIN
-        ip = Some(Ipv4Addr::new(0, 0, 0, 0));
     }
 
+    // Everything needed from the record has been copied out, so release the read lock before encoding
+    drop(records);
+
     // Unwrap ip, use 0.0.0.0 if None
-    let ip = ip.unwrap_or_else(|| Ipv4Addr::new(0, 0, 0, 0));
+    let ip = ip.unwrap_or(Ipv4Addr::UNSPECIFIED);
 
-    build_response(query, ip, response_code, ttl, record_type, class)
+    build_response(query, ip, response_code, ttl)
 }
-
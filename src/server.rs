@@ -1,12 +1,12 @@
 use tokio::net::UdpSocket;
-use tokio::sync::{mpsc, RwLock};
+use tokio::sync::RwLock;
 use std::error::Error;
 use std::sync::Arc;
 use log::{info, debug, error};
 
-use crate::packet;
+use crate::packet::{self, DnsQuery};
 use crate::query;
-use crate::update::{self, DnsRecords};
+use crate::update::DnsRecords;
 
 /// Runs the DNS server, binding to the specified address and handling incoming packets.
 ///
@@ -20,77 +20,61 @@ use crate::update::{self, DnsRecords};
 pub async fn run(addr: &str, records: Arc<RwLock<DnsRecords>>) -> Result<(), Box<dyn Error>> {
     // Bind the UDP socket to the specified address and wrap it in an Arc to allow shared ownership.
     let socket = Arc::new(UdpSocket::bind(addr).await?);
-    // Create an asynchronous channel for sending and receiving packets.
-    let (tx, mut rx) = mpsc::channel::<(Vec<u8>, std::net::SocketAddr)>(1024);
 
     // Log that the server has successfully started
     info!("DNS server listening on {}", addr);
     info!("Server has successfully started");
 
-
-    // Clone the Arc to share the socket with the task that handles incoming packets.
-    let socket_clone = Arc::clone(&socket);
-    let records_clone = Arc::clone(&records);
-    tokio::spawn(async move {
-        // Buffer to hold incoming packet data.
-        let mut buf = vec![0u8; 512];
-        loop {
-            // Asynchronously wait for an incoming packet.
-            match socket_clone.recv_from(&mut buf).await {
-                Ok((len, addr)) => {
-                    debug!("Received packet from {}: {:?}", addr, &buf[..len]);
-                    // Send the packet data and the sender's address to the channel.
-                    if tx.send((buf[..len].to_vec(), addr)).await.is_err() {
-                        error!("Receiver dropped");
-                        break;
+    // Buffer to hold incoming packet data.
+    let mut buf = vec![0u8; 512];
+    loop {
+        // Asynchronously wait for an incoming packet.
+        match socket.recv_from(&mut buf).await {
+            Ok((len, addr)) => {
+                debug!("Received packet from {}: {:?}", addr, &buf[..len]);
+                // Parse straight out of the receive buffer so the raw bytes never need to be copied;
+                // only the decoded query is handed to the task.
+                let query = match packet::parse(&buf[..len]) {
+                    Ok(query) => query,
+                    Err(e) => {
+                        error!("Failed to parse packet: {}", e);
+                        continue;
                     }
-                },
-                Err(e) => {
-                    error!("Failed to receive packet: {}", e);
-                }
-            }
-        }
-    });
+                };
+                debug!("Successfully parsed query from {}", addr);
 
-    // Loop to handle packets received from the channel.
-    while let Some((packet, addr)) = rx.recv().await {
-        // Clone the Arc to share the socket with the task that handles the packet.
-        let socket_clone = Arc::clone(&socket);
-        let records_clone = Arc::clone(&records);
+                // Clone the Arc to share the socket with the task that handles the query.
+                let socket_clone = Arc::clone(&socket);
+                let records_clone = Arc::clone(&records);
 
-
-        // Spawn a new asynchronous task to handle the packet.
-        tokio::spawn(async move {
-            debug!("Spawning task to handle packet from {}",addr);
-            handle_packet(packet, addr, socket_clone, records_clone).await;
-        });
+                // Spawn a new asynchronous task to handle the query.
+                tokio::spawn(async move {
+                    debug!("Spawning task to handle query from {}", addr);
+                    handle_packet(query, addr, socket_clone, records_clone).await;
+                });
+            },
+            Err(e) => {
+                error!("Failed to receive packet: {}", e);
+            }
+        }
     }
-
-    Ok(())
 }
 
-/// Handles a received DNS packet by parsing it, processing the query, and sending a response.
+/// Handles a parsed DNS query by processing it and sending the response.
 ///
 /// # Parameters
-/// - `packet`: A vector of bytes representing the received DNS packet.
+/// - `query`: The `DnsQuery` parsed from the received packet.
 /// - `addr`: The socket address of the sender of the packet.
 /// - `socket`: An atomic reference-counted pointer to a `UdpSocket`, allowing the socket to be shared across tasks.
 ///
 /// # Returns
 /// - This function does not return a value. It performs its work asynchronously.
-async fn handle_packet(packet: Vec<u8>, addr: std::net::SocketAddr, socket: Arc<UdpSocket>, records: Arc<RwLock<DnsRecords>>) {
-    debug!("Handling packet from {}", addr);
-    match packet::parse(&packet) {
-        Ok(query) => {
-            debug!("Successfully parsed query from {}", addr);
-            let response = query::handle_query(query, records).await;
-            if let Err(e) = socket.send_to(&response, &addr).await {
-                error!("Failed to send response to {}: {}", addr, e);
-            } else {
-                debug!("Successfully sent response to {}: response = {:?}", addr, response);
-            }
-        }
-        Err(e) => error!("Failed to parse packet: {}", e),
+async fn handle_packet(query: DnsQuery, addr: std::net::SocketAddr, socket: Arc<UdpSocket>, records: Arc<RwLock<DnsRecords>>) {
+    debug!("Handling query from {}", addr);
+    let response = query::handle_query(query, records).await;
+    if let Err(e) = socket.send_to(&response, &addr).await {
+        error!("Failed to send response to {}: {}", addr, e);
+    } else {
+        debug!("Successfully sent response to {}: response = {:?}", addr, response);
     }
 }
-
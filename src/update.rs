@@ -1,13 +1,13 @@
 use std::collections::HashMap;
 use std::sync::Arc;
 use std::fs::File;
-use std::io::{BufReader, BufWriter, Write, BufRead, Error as IoError};
-use tokio::sync::RwLock;
+use std::io::{BufReader, Write, BufRead, Error as IoError};
+use tokio::sync::{Mutex, RwLock};
 use std::net::Ipv4Addr;
 use serde::{Deserialize, Serialize};
 use log::{info, debug, error};
 
-#[derive(Debug, Serialize, Deserialize, Clone)]
+#[derive(Debug, Serialize, Deserialize, Clone, PartialEq)]
 pub struct DnsRecord {
     pub name: String,
     pub ip: Option<Ipv4Addr>, // Make IP optional to handle non-IP records
@@ -19,13 +19,25 @@ pub struct DnsRecord {
 
 pub type DnsRecords = HashMap<String, DnsRecord>;
 
+/// Serializes rewrites of the records file. Kept separate from the records lock so that
+/// queued saves never sit on the `RwLock` and hold up DNS lookups behind disk I/O.
+static SAVE_LOCK: Mutex<()> = Mutex::const_new(());
+
+fn parse_ttl(ttl: &str, line: &str) -> Result<u32, std::num::ParseIntError> {
+    ttl.parse::<u32>().map_err(|e| {
+        error!("Failed to parse TTL for line {}: {}", line, e);
+        e
+    })
+}
+
 pub fn load_records_from_file(file_path: &str) -> Result<DnsRecords, Box<dyn std::error::Error + Send + Sync>> {
     let file = File::open(file_path)?;
     let reader = BufReader::new(file);
     let mut records = DnsRecords::new();
 
     for line in reader.lines() {
-        let line = line?.trim().to_string();
+        let line = line?;
+        let line = line.trim();
         if line.is_empty() || line.starts_with('#') {
             continue; // Skip empty lines and comments
         }
@@ -35,10 +47,7 @@ pub fn load_records_from_file(file_path: &str) -> Result<DnsRecords, Box<dyn std
                 Ok(ip) => Some(ip),
                 Err(_) => None, // If IP parsing fails, set it to None
             };
-            let ttl = parts[2].parse::<u32>().map_err(|e| {
-                error!("Failed to parse TTL for line {}: {}", line, e);
-                e
-            })?;
+            let ttl = parse_ttl(parts[2], line)?;
             let record = DnsRecord {
                 name: parts[0].to_string(),
                 ip,
@@ -52,10 +61,7 @@ pub fn load_records_from_file(file_path: &str) -> Result<DnsRecords, Box<dyn std
             let record = DnsRecord {
                 name: parts[0].to_string(),
                 ip: None,
-                ttl: parts[2].parse::<u32>().map_err(|e| {
-                    error!("Failed to parse TTL for line {}: {}", line, e);
-                    e
-                })?,
+                ttl: parse_ttl(parts[2], line)?,
                 record_type: "CNAME".to_string(),
                 class: parts[3].to_string(),
                 value: Some(parts[1].to_string()), // CNAME value
@@ -65,10 +71,7 @@ pub fn load_records_from_file(file_path: &str) -> Result<DnsRecords, Box<dyn std
             let record = DnsRecord {
                 name: parts[0].to_string(),
                 ip: None,
-                ttl: parts[2].parse::<u32>().map_err(|e| {
-                    error!("Failed to parse TTL for line {}: {}", line, e);
-                    e
-                })?,
+                ttl: parse_ttl(parts[2], line)?,
                 record_type: "TXT".to_string(),
                 class: parts[4].to_string(),
                 value: Some(parts[1].to_string()), // TXT value
@@ -81,23 +84,22 @@ pub fn load_records_from_file(file_path: &str) -> Result<DnsRecords, Box<dyn std
     Ok(records)
 }
 
-pub fn save_records_to_file(file_path: &str, records: &DnsRecords) -> Result<(), IoError> {
-    let file = File::create(file_path)?;
-    let mut writer = BufWriter::new(file);
-
+/// Writes every record in the records file format to `writer`.
+fn write_records<W: Write>(writer: &mut W, records: &DnsRecords) -> Result<(), IoError> {
     for record in records.values() {
-        writeln!(
-            writer,
-            "{}:{}:{}:{}:{}{}",
-            record.name,
-            record.ip.map_or_else(|| record.value.clone().unwrap_or_default(), |ip| ip.to_string()), // Handle None IP case
-            record.ttl,
-            record.record_type,
-            record.class,
-            record.value.as_ref().map_or("".to_string(), |v| format!(":{}", v))
-        )?;
+        // Write each field straight into the buffer rather than formatting temporary strings
+        write!(writer, "{}:", record.name)?;
+        match (record.ip, &record.value) {
+            (Some(ip), _) => write!(writer, "{}", ip)?,
+            (None, Some(value)) => write!(writer, "{}", value)?, // Handle None IP case
+            (None, None) => {}
+        }
+        write!(writer, ":{}:{}:{}", record.ttl, record.record_type, record.class)?;
+        if let Some(value) = &record.value {
+            write!(writer, ":{}", value)?;
+        }
+        writeln!(writer)?;
     }
-    writer.flush()?;
     Ok(())
 }
 
@@ -111,11 +113,171 @@ pub fn load_records(file_path: &str) -> Arc<RwLock<DnsRecords>> {
     }
 }
 
-pub async fn update_record(records: Arc<RwLock<DnsRecords>>, new_record: DnsRecord) {
-    let mut records = records.write().await;
-    info!("Updating record: {:?}", new_record);
-    records.insert(new_record.name.clone(), new_record);
-    debug!("Current records: {:?}", *records);
-    save_records_to_file("dns_records.txt", &*records).expect("Failed to save DNS records");
+pub async fn update_record(records: Arc<RwLock<DnsRecords>>, new_record: DnsRecord, file_path: &str) {
+    update_records(records, vec![new_record], file_path).await;
 }
 
+pub async fn update_records(records: Arc<RwLock<DnsRecords>>, new_records: Vec<DnsRecord>, file_path: &str) {
+    let mut changed = false;
+    {
+        let mut records = records.write().await;
+        for new_record in new_records {
+            if records.get(&new_record.name) == Some(&new_record) {
+                debug!("Record unchanged, skipping: {:?}", new_record);
+                continue;
+            }
+            info!("Updating record: {:?}", new_record);
+            records.insert(new_record.name.clone(), new_record);
+            changed = true;
+        }
+    }
+    // Nothing to persist if every record was already up to date
+    if !changed {
+        return;
+    }
+
+    // Saves run one at a time, and each one snapshots the records only after taking the
+    // save lock, so the last file written always reflects the latest state.
+    let _save_guard = SAVE_LOCK.lock().await;
+    let body = {
+        let records = records.read().await;
+        debug!("Current records: {:?}", *records);
+        // Serialize in memory so the records lock is released before any disk I/O
+        let mut body = Vec::new();
+        write_records(&mut body, &records).expect("Writing records to memory cannot fail");
+        body
+    };
+    // Rewrite the file on the blocking pool so disk I/O doesn't stall the runtime threads answering queries
+    let file_path = file_path.to_owned();
+    tokio::task::spawn_blocking(move || std::fs::write(file_path, body))
+        .await
+        .expect("Save task panicked")
+        .expect("Failed to save DNS records");
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn a_record(name: &str, ip: [u8; 4]) -> DnsRecord {
+        DnsRecord {
+            name: name.to_string(),
+            ip: Some(Ipv4Addr::from(ip)),
+            ttl: 300,
+            record_type: "A".to_string(),
+            class: "IN".to_string(),
+            value: None,
+        }
+    }
+
+    /// A records file path under the temp dir, unique to this test and process.
+    fn temp_records_file(test: &str) -> String {
+        let path = std::env::temp_dir().join(format!("rind_{}_{}.txt", test, std::process::id()));
+        let _ = std::fs::remove_file(&path);
+        path.to_str().unwrap().to_string()
+    }
+
+    #[test]
+    fn write_records_emits_one_line_per_record() {
+        let records: DnsRecords = [
+            a_record("www.example.com", [192, 168, 1, 10]),
+            DnsRecord {
+                name: "Cftp.example.com".to_string(),
+                ip: None,
+                ttl: 600,
+                record_type: "CNAME".to_string(),
+                class: "IN".to_string(),
+                value: Some("www.example.com".to_string()),
+            },
+            DnsRecord {
+                name: "'txt.example.com".to_string(),
+                ip: None,
+                ttl: 60,
+                record_type: "TXT".to_string(),
+                class: "IN".to_string(),
+                value: Some("hello".to_string()),
+            },
+        ]
+        .into_iter()
+        .map(|record| (record.name.clone(), record))
+        .collect();
+
+        let mut body = Vec::new();
+        write_records(&mut body, &records).unwrap();
+
+        // HashMap iteration order is unspecified, so compare the lines sorted
+        let body = String::from_utf8(body).unwrap();
+        let mut lines: Vec<&str> = body.lines().collect();
+        lines.sort();
+        assert_eq!(lines, [
+            "'txt.example.com:hello:60:TXT:IN:hello",
+            "Cftp.example.com:www.example.com:600:CNAME:IN:www.example.com",
+            "www.example.com:192.168.1.10:300:A:IN",
+        ]);
+        assert!(body.ends_with('\n'));
+
+        // Read the output back with the loader, which does not restore the trailing value field
+        // of CNAME and TXT lines, so only records without a value must come back unchanged
+        let file_path = temp_records_file("write_records");
+        std::fs::write(&file_path, &body).unwrap();
+        let loaded = load_records_from_file(&file_path).unwrap();
+        std::fs::remove_file(&file_path).unwrap();
+        assert_eq!(loaded.len(), records.len());
+        for (name, record) in &records {
+            let loaded = &loaded[name];
+            assert_eq!(loaded.ttl, record.ttl);
+            assert_eq!(loaded.record_type, record.record_type);
+            assert_eq!(loaded.class, record.class);
+            if record.value.is_none() {
+                assert_eq!(loaded, record);
+            }
+        }
+    }
+
+    #[tokio::test]
+    async fn batch_is_applied_and_saved_once() {
+        let file_path = temp_records_file("batch");
+        let records = Arc::new(RwLock::new(DnsRecords::new()));
+        let batch = vec![a_record("a.example.com", [10, 0, 0, 1]), a_record("b.example.com", [10, 0, 0, 2])];
+
+        update_records(Arc::clone(&records), batch.clone(), &file_path).await;
+
+        assert_eq!(records.read().await.len(), 2);
+        let saved = load_records_from_file(&file_path).unwrap();
+        for record in &batch {
+            assert_eq!(saved.get(&record.name), Some(record));
+        }
+        std::fs::remove_file(&file_path).unwrap();
+    }
+
+    #[tokio::test]
+    async fn unchanged_records_are_skipped() {
+        let file_path = temp_records_file("unchanged");
+        let records = Arc::new(RwLock::new(DnsRecords::new()));
+        update_record(Arc::clone(&records), a_record("a.example.com", [10, 0, 0, 1]), &file_path).await;
+
+        // One record is already up to date, the other changes its IP
+        let batch = vec![a_record("a.example.com", [10, 0, 0, 1]), a_record("b.example.com", [10, 0, 0, 2])];
+        update_records(Arc::clone(&records), batch, &file_path).await;
+        update_record(Arc::clone(&records), a_record("b.example.com", [10, 0, 0, 3]), &file_path).await;
+
+        let records = records.read().await;
+        assert_eq!(records.len(), 2);
+        assert_eq!(records["a.example.com"].ip, Some(Ipv4Addr::new(10, 0, 0, 1)));
+        assert_eq!(records["b.example.com"].ip, Some(Ipv4Addr::new(10, 0, 0, 3)));
+        assert_eq!(load_records_from_file(&file_path).unwrap(), *records);
+        std::fs::remove_file(&file_path).unwrap();
+    }
+
+    #[tokio::test]
+    async fn no_save_when_nothing_changed() {
+        let file_path = temp_records_file("no_save");
+        let record = a_record("a.example.com", [10, 0, 0, 1]);
+        let records = Arc::new(RwLock::new(DnsRecords::from([(record.name.clone(), record.clone())])));
+
+        update_records(Arc::clone(&records), vec![record], &file_path).await;
+
+        // Every record was already up to date, so the file is never written
+        assert!(!std::path::Path::new(&file_path).exists());
+    }
+}